@@ -4,34 +4,34 @@ from typing import Optional
 from flat.pos import Pos
 
 
-@dataclass
+@dataclass(slots=True)
 class Lit:
     value: int | bool | str
     pos: Pos
 
 
-@dataclass
+@dataclass(slots=True)
 class Ident:
     name: str
     pos: Pos
 
 
 class Clause:
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class Token(Clause):
     text: Lit
 
 
-@dataclass
+@dataclass(slots=True)
 class Symbol(Clause):
     """A nonterminal symbol or referring to another lang."""
     ident: Ident
 
 
-@dataclass
+@dataclass(slots=True)
 class CharRange(Clause):
     lhs: Lit  # char
     rhs: Lit  # char
@@ -44,32 +44,32 @@ class CharRange(Clause):
     def end(self) -> int:
         return ord(self.rhs.value)
 
-    @property
-    def get_range(self) -> range:
-        return range(self.begin, self.end + 1)
-
 
 class RepRange:
+    __slots__ = ()
     lower: int
     upper: Optional[int]  # None = inf
 
 
 class RepStar(RepRange):
+    __slots__ = ()
     lower = 0
     upper = None
 
 
 class RepPlus(RepRange):
+    __slots__ = ()
     lower = 1
     upper = None
 
 
 class RepOpt(RepRange):
+    __slots__ = ()
     lower = 0
     upper = 1
 
 
-@dataclass
+@dataclass(slots=True)
 class RepExactly(RepRange):
     times: Lit  # int
 
@@ -82,7 +82,7 @@ class RepExactly(RepRange):
         return self.times.value
 
 
-@dataclass
+@dataclass(slots=True)
 class RepInRange(RepRange):
     at_least: Optional[Lit]  # int
     at_most: Optional[Lit]  # int
@@ -96,23 +96,23 @@ class RepInRange(RepRange):
         return self.at_most.value if self.at_most else None
 
 
-@dataclass
+@dataclass(slots=True)
 class Rep(Clause):
     clause: Clause
     rep_range: RepRange
 
 
-@dataclass
+@dataclass(slots=True)
 class Seq(Clause):
     clauses: list[Clause]
 
 
-@dataclass
+@dataclass(slots=True)
 class Alt(Clause):
     clauses: list[Clause]
 
 
-@dataclass
+@dataclass(slots=True)
 class Rule:
     ident: Ident
     body: Clause
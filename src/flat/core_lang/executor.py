@@ -1,17 +1,22 @@
+from functools import lru_cache
 from importlib import import_module
 from types import ModuleType
-from typing import Any
+from typing import Any, Callable, Tuple
 
 from flat.core_lang.ast import *
 from flat.core_lang.predef import *
 
 
+load_ctx = ast.Load()
+store_ctx = ast.Store()
+
+
 def load(name: str) -> ast.Name:
-    return ast.Name(name, ctx=ast.Load())
+    return ast.Name(name, ctx=load_ctx)
 
 
 def store(name: str) -> ast.Name:
-    return ast.Name(name, ctx=ast.Store())
+    return ast.Name(name, ctx=store_ctx)
 
 
 def load_defs_to(m: ModuleType, env: dict[str, Any]) -> None:
@@ -20,6 +25,45 @@ def load_defs_to(m: ModuleType, env: dict[str, Any]) -> None:
             env[key] = m.__dict__[key]
 
 
+@lru_cache(maxsize=None)
+def base_env() -> dict[str, Any]:
+    """The public definitions of `flat.lib` and the predefined functions, collected once.
+    Callers must copy it before adding their own definitions."""
+    env = {}
+    load_defs_to(import_module('flat.lib'), env)
+    load_defs_to(import_module('flat.core_lang.predef'), env)
+    return env
+
+
+def unary_op(op: ast.unaryop, args: list[ast.expr]) -> ast.expr:
+    assert len(args) == 1
+    return ast.UnaryOp(op, args[0])
+
+
+def binary_op(op: ast.operator, args: list[ast.expr]) -> ast.expr:
+    assert len(args) == 2
+    return ast.BinOp(args[0], op, args[1])
+
+
+def bool_op(op: ast.boolop, args: list[ast.expr]) -> ast.expr:
+    assert len(args) == 2
+    return ast.BoolOp(op, args)
+
+
+def compare_op(op: ast.cmpop, args: list[ast.expr]) -> ast.expr:
+    assert len(args) == 2
+    return ast.Compare(args[0], [op], [args[1]])
+
+
+# operator name -> (builder, python operator)
+op_table: dict[str, Tuple[Callable[[Any, list[ast.expr]], ast.expr], ast.AST]] = {
+    **{name: (unary_op, op) for name, op in zip(unary_ops, py_unary_ops)},
+    **{name: (binary_op, op) for name, op in zip(binary_ops, py_binary_ops)},
+    **{name: (bool_op, op) for name, op in zip(bool_ops, py_bool_ops)},
+    **{name: (compare_op, op) for name, op in zip(compare_ops, py_compare_ops)},
+}
+
+
 class Executor:
     def __init__(self, instrumented_program: Program, env: dict[str, Any]):
         body = [self.visit_def(tree) for tree in instrumented_program]
@@ -31,10 +75,7 @@ class Executor:
         self.env = env
 
     def __call__(self, method_name: str = 'main') -> None:
-        env = {}
-        load_defs_to(import_module('flat.lib'), env)
-        load_defs_to(import_module('flat.core_lang.predef'), env)
-        env |= self.env
+        env = base_env() | self.env
         exec(self.user_code + f'\n{method_name}()', env, env)
 
     def visit_def(self, tree: Def) -> ast.FunctionDef:
@@ -88,7 +129,7 @@ class Executor:
             case Constant(Lit(value)):
                 return ast.Constant(value)
             case Var(Ident(name)):
-                return ast.Name(name, ctx=ast.Load())
+                return load(name)
             case App(fun, args):
                 arguments = [self.visit_expr(e) for e in args]
                 match fun:
@@ -100,7 +141,7 @@ class Executor:
             case InLang(receiver, Ident(lang_name)):
                 word = self.visit_expr(receiver)
                 return ast.Compare(word, [ast.In()],
-                                   [ast.Attribute(load(lang_name), 'grammar', ctx=ast.Load())])
+                                   [ast.Attribute(load(lang_name), 'grammar', ctx=load_ctx)])
             case Lambda(params, body):
                 args = ast.arguments([], [ast.arg(param.name) for param in params], None, [], [], None, [])
                 expr = self.visit_expr(body)
@@ -114,24 +155,5 @@ class Executor:
                 raise NotImplementedError
 
     def call_op(self, fun_name: str, args: list[ast.expr]) -> ast.expr:
-        if fun_name in unary_ops:
-            op = py_unary_ops[unary_ops.index(fun_name)]
-            assert len(args) == 1
-            return ast.UnaryOp(op, args[0])
-
-        if fun_name in binary_ops:
-            op = py_binary_ops[binary_ops.index(fun_name)]
-            assert len(args) == 2
-            return ast.BinOp(args[0], op, args[1])
-
-        if fun_name in bool_ops:
-            op = py_bool_ops[bool_ops.index(fun_name)]
-            assert len(args) == 2
-            return ast.BoolOp(op, args)
-
-        if fun_name in compare_ops:
-            op = py_compare_ops[compare_ops.index(fun_name)]
-            assert len(args) == 2
-            return ast.Compare(args[0], [op], [args[1]])
-
-        assert False
+        builder, op = op_table[fun_name]
+        return builder(op, args)
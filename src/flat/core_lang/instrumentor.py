@@ -1,3 +1,4 @@
+from functools import cached_property
 from typing import Any
 
 from flat.core_lang.ast import *
@@ -17,11 +18,11 @@ class FunSig:
     preconditions: list[Expr]  # bind params
     postconditions: list[Expr]  # bind params and '_' for return value
 
-    @property
+    @cached_property
     def param_names(self) -> list[str]:
         return [x for x, _ in self.params]
 
-    @property
+    @cached_property
     def param_types(self) -> list[Type]:
         return [t for _, t in self.params]
 
@@ -62,7 +63,7 @@ class Instrumentor:
                 # check params
                 method_params: list[Tuple[str, Type]] = []
                 for param_ident, type_annot in params:
-                    if any([x == param_ident.name for x, _ in method_params]):
+                    if param_ident.name in scope:  # holds exactly the params seen so far
                         raise Redefined('param', param_ident.name, self.frame_from_pos(param_ident.pos))
 
                     typ = self.typer.expand(type_annot)
@@ -72,10 +73,9 @@ class Instrumentor:
                 # check pre-conditions
                 preconditions: list[Expr] = []
                 for spec in specs:
-                    match spec:
-                        case MethodPreSpec(cond):
-                            self.typer.ensure_bool(cond, scope)
-                            preconditions.append(cond)
+                    if isinstance(spec, MethodPreSpec):
+                        self.typer.ensure_bool(spec.cond, scope)
+                        preconditions.append(spec.cond)
 
                 # check return param
                 if returns:
@@ -87,10 +87,9 @@ class Instrumentor:
                 # check post-conditions
                 postconditions: list[Expr] = []
                 for spec in specs:
-                    match spec:
-                        case MethodPostSpec(cond):
-                            self.typer.ensure_bool(cond, scope)
-                            postconditions.append(cond)
+                    if isinstance(spec, MethodPostSpec):
+                        self.typer.ensure_bool(spec.cond, scope)
+                        postconditions.append(spec.cond)
 
                 # build method info
                 sig = FunSig(ident.name, method_params, return_typ, preconditions, postconditions)
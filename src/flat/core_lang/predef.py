@@ -2,19 +2,19 @@ import ast
 
 # operators
 
-unary_ops = ['prefix_-', 'prefix_!']
-py_unary_ops: list[ast.unaryop] = [ast.USub(), ast.Not()]
+unary_ops = ('prefix_-', 'prefix_!')
+py_unary_ops: tuple[ast.unaryop, ...] = (ast.USub(), ast.Not())
 
-binary_ops = ['+', '-', '*', '/', '%']
-py_binary_ops: list[ast.operator] = [ast.Add(), ast.Sub(), ast.Mult(), ast.FloorDiv(), ast.Mod()]
+binary_ops = ('+', '-', '*', '/', '%')
+py_binary_ops: tuple[ast.operator, ...] = (ast.Add(), ast.Sub(), ast.Mult(), ast.FloorDiv(), ast.Mod())
 
-bool_ops = ['&&', '||']
-py_bool_ops: list[ast.boolop] = [ast.And(), ast.Or()]
+bool_ops = ('&&', '||')
+py_bool_ops: tuple[ast.boolop, ...] = (ast.And(), ast.Or())
 
-compare_ops = ['>=', '<=', '>', '<', '==', '!=']
-py_compare_ops: list[ast.cmpop] = [ast.GtE(), ast.LtE(), ast.Gt(), ast.Lt(), ast.Eq(), ast.NotEq()]
+compare_ops = ('>=', '<=', '>', '<', '==', '!=')
+py_compare_ops: tuple[ast.cmpop, ...] = (ast.GtE(), ast.LtE(), ast.Gt(), ast.Lt(), ast.Eq(), ast.NotEq())
 
-ops = unary_ops + binary_ops + bool_ops + compare_ops
+ops = frozenset(unary_ops + binary_ops + bool_ops + compare_ops)
 
 
 # library functions
@@ -7,6 +7,12 @@ from flat.errors import Undefined
 from flat.grammars import GrammarBuilder
 from flat.typing import *
 
+builtin_types: dict[str, BuiltinType] = {
+    'Int': BuiltinType.Int,
+    'Bool': BuiltinType.Bool,
+    'String': BuiltinType.String,
+}
+
 
 class Typer(GrammarBuilder):
     def __init__(self, filename: str):
@@ -32,13 +38,9 @@ class Typer(GrammarBuilder):
 
     def expand(self, tree: TypeTree) -> Type:
         match tree:
-            case NamedTypeTree(Ident('Int')):
-                return BuiltinType.Int
-            case NamedTypeTree(Ident('Bool')):
-                return BuiltinType.Bool
-            case NamedTypeTree(Ident('String')):
-                return BuiltinType.String
             case NamedTypeTree(Ident(name, pos)):
+                if name in builtin_types:
+                    return builtin_types[name]
                 if name not in self._grammars:
                     raise Undefined('lang', name, self.frame_from_pos(pos))
                 return LangType(self._grammars[name])
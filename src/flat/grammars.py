@@ -1,5 +1,7 @@
 import abc
-from functools import reduce
+import sys
+from collections import deque
+from functools import reduce, lru_cache, cached_property
 from typing import Optional
 
 from isla.derivation_tree import DerivationTree
@@ -10,12 +12,29 @@ from isla.type_defs import Grammar as ISLaGrammar
 from flat.ast import (Rule, Clause, Token, Symbol, CharRange, Rep, Seq, Alt, RepExactly, RepInRange, Lit, Ident)
 
 
+@lru_cache(maxsize=None)
+def nonterminal_of(name: str) -> str:
+    """The ISLa nonterminal of a rule name, interned so that equal labels are the same object."""
+    return sys.intern(f'<{name}>')
+
+
+@lru_cache(maxsize=256)
+def expand_range(begin: int, end: int) -> tuple[str, ...]:
+    """The characters with code points in `[begin, end]`, interned."""
+    return tuple(sys.intern(chr(code)) for code in range(begin, end + 1))
+
+
 class Grammar:
     def __init__(self, name: str, clauses: dict[str, Clause], isla_grammar: ISLaGrammar):
         self.name = name
         self.clauses = clauses
         self.isla_solver = ISLaSolver(isla_grammar)
 
+    @cached_property
+    def auxiliary_clauses(self) -> dict[str, Clause]:
+        """The clauses of all rules but `start`, which an importing grammar copies as they are."""
+        return {k: c for k, c in self.clauses.items() if k != 'start'}
+
     def __contains__(self, word: str) -> bool:
         try:
             self.isla_solver.parse(word, skip_check=True, silent=True)
@@ -37,13 +56,7 @@ class Grammar:
 
         def acc(n1, n2):
             """Addition of times: min(2, n1 + n2)."""
-            match n1 + n2:
-                case 0:
-                    return 0
-                case 1:
-                    return 1
-                case _:
-                    return 2
+            return min(2, n1 + n2)
 
         if isinstance(clause, str):
             clause = self.clauses[clause]
@@ -72,6 +85,12 @@ class GrammarBuilder:
     def lookup_lang(self, name: str) -> Optional[Grammar]:
         raise NotImplementedError
 
+    def find_lang(self, name: str) -> Optional[Grammar]:
+        """Memoized `lookup_lang`: a grammar may refer to the same imported lang many times."""
+        if name not in self._langs:
+            self._langs[name] = self.lookup_lang(name)
+        return self._langs[name]
+
     def validate(self, rules: list[Rule]) -> dict[str, Rule]:
         grammar: dict[str, Rule] = {}
         for rule in rules:
@@ -85,49 +104,48 @@ class GrammarBuilder:
             raise NameError
             # self.issuer.error(MissingStartRule(ident.pos))
 
-        def check(clause: Clause) -> None:
-            match clause:
-                case CharRange(Lit(lower), lit) as cs:
-                    if cs.end < cs.begin:
-                        raise NameError(f"{cs.end} < {cs.begin} in clause {cs}")
-                        # self.issuer.error(InvalidClause(f'this charactor (code={cs.end}) must > '
-                        #                                 f'"{lower}" (code={cs.begin})', lit.pos))
-                case Symbol(Ident('start')):
-                    raise NameError
-                    # self.issuer.error(InvalidClause('using start rule is not allowed here', clause.pos,
-                    #                                 hint='introduce a new rule and let start rule point to it'))
-                case Symbol(Ident(name)):
-                    if name in grammar:
-                        pass
-                    elif self.lookup_lang(name) is None:
-                        raise NameError(name)
-                        # self.issuer.error(UndefinedName(clause.pos))
-                case Rep(clause, rep_range):
-                    check(clause)
-                    match rep_range:
-                        case RepExactly(lit):
-                            match lit.value:
-                                case 0:
-                                    raise NameError
-                                    # self.issuer.error(InvalidClause('0 is not allowed here', lit.pos,
-                                    #                                 hint='use the empty clause "" instead'))
-                                case 1:
-                                    raise NameError
-                                    # self.issuer.error(InvalidClause('1 is redundant here', lit.pos,
-                                    #                                 hint='drop the repetition in this clause'))
-                        case RepInRange(_, Lit() as lit) if lit.value == 0:
-                            raise NameError
-                            # self.issuer.error(InvalidClause('0 is not allowed here', lit.pos,
-                            #                                 hint='use the empty clause "" instead'))
-                        case RepInRange(Lit(lower), Lit() as lit) if lit.value <= lower:
-                            raise NameError
-                            # self.issuer.error(InvalidClause(f'this value must > {lower}', lit.pos))
-                case Seq(clauses):
-                    for clause in clauses:
-                        check(clause)
-                case Alt(clauses):
-                    for clause in clauses:
-                        check(clause)
+        def check(root: Clause) -> None:
+            stack = [root]  # explicit stack: deeply nested clauses must not hit the recursion limit
+            while len(stack) > 0:
+                clause = stack.pop()
+                match clause:
+                    case CharRange(Lit(lower), lit) as cs:
+                        if cs.end < cs.begin:
+                            raise NameError(f"{cs.end} < {cs.begin} in clause {cs}")
+                            # self.issuer.error(InvalidClause(f'this charactor (code={cs.end}) must > '
+                            #                                 f'"{lower}" (code={cs.begin})', lit.pos))
+                    case Symbol(Ident('start')):
+                        raise NameError
+                        # self.issuer.error(InvalidClause('using start rule is not allowed here', clause.pos,
+                        #                                 hint='introduce a new rule and let start rule point to it'))
+                    case Symbol(Ident(name)):
+                        if name in grammar:
+                            pass
+                        elif self.find_lang(name) is None:
+                            raise NameError(name)
+                            # self.issuer.error(UndefinedName(clause.pos))
+                    case Rep(c, rep_range):
+                        stack.append(c)
+                        match rep_range:
+                            case RepExactly(lit):
+                                match lit.value:
+                                    case 0:
+                                        raise NameError
+                                        # self.issuer.error(InvalidClause('0 is not allowed here', lit.pos,
+                                        #                                 hint='use the empty clause "" instead'))
+                                    case 1:
+                                        raise NameError
+                                        # self.issuer.error(InvalidClause('1 is redundant here', lit.pos,
+                                        #                                 hint='drop the repetition in this clause'))
+                            case RepInRange(_, Lit() as lit) if lit.value == 0:
+                                raise NameError
+                                # self.issuer.error(InvalidClause('0 is not allowed here', lit.pos,
+                                #                                 hint='use the empty clause "" instead'))
+                            case RepInRange(Lit(lower), Lit() as lit) if lit.value <= lower:
+                                raise NameError
+                                # self.issuer.error(InvalidClause(f'this value must > {lower}', lit.pos))
+                    case Seq(clauses) | Alt(clauses):
+                        stack.extend(reversed(clauses))
 
         for rule in rules:
             check(rule.body)
@@ -135,38 +153,34 @@ class GrammarBuilder:
 
     def reduce(self, grammar: dict[str, Rule]) -> dict[str, Clause]:
         clauses: dict[str, Clause] = {}
+        enqueued = {'start'}
 
-        def collect_used(clause: Clause, buf: set[str]) -> None:
+        def collect_used(clause: Clause, queue: deque[str]) -> None:
+            """Enqueue the local rules used by `clause` that are not yet enqueued."""
             match clause:
                 case Symbol(Ident(name)):
                     if name in grammar:
-                        buf.add(name)
+                        if name not in enqueued:
+                            enqueued.add(name)
+                            queue.append(name)
                     elif name not in clauses:
-                        g = self.lookup_lang(name)
+                        g = self.find_lang(name)
+                        assert g is not None  # checked by `validate`
                         clauses[name] = g.clauses['start']
-                        for k in g.clauses:
-                            if k != 'start':
-                                assert k not in clauses
-                                clauses[k] = g.clauses[k]
+                        assert clauses.keys().isdisjoint(g.auxiliary_clauses)
+                        clauses.update(g.auxiliary_clauses)
                 case Rep(c, _):
-                    collect_used(c, buf)
-                case Seq(cs):
-                    for c in cs:
-                        collect_used(c, buf)
-                case Alt(cs):
+                    collect_used(c, queue)
+                case Seq(cs) | Alt(cs):
                     for c in cs:
-                        collect_used(c, buf)
+                        collect_used(c, queue)
 
-        queue = ['start']
+        queue = deque(['start'])
         while len(queue) > 0:
-            n = queue.pop(0)
-            if n not in clauses:
-                clauses[n] = grammar[n].body
-                used = set()
-                collect_used(grammar[n].body, used)
-                for x in used:
-                    if x not in clauses:
-                        queue.append(x)
+            n = queue.popleft()
+            body = grammar[n].body
+            clauses[n] = body
+            collect_used(body, queue)
 
         return clauses
 
@@ -176,14 +190,18 @@ class GrammarBuilder:
                 if rule.name == 'start':
                     rule.body = Symbol(Ident(start, None))
 
+        self._langs: dict[str, Optional[Grammar]] = {}
         grammar = self.validate(rules)
         clauses = self.reduce(grammar)
 
         self._grammar = {}
+        self._groups: dict[tuple[str, ...], str] = {}
+        self._chains: dict[tuple[str, int], str] = {}
+        self._loops: dict[tuple[str, int], str] = {}
         self._next_counter = 0
 
         for symbol in clauses:
-            label = f'<{symbol}>'
+            label = nonterminal_of(symbol)
             self._grammar[label] = self._convert(clauses[symbol])
             if label == '<start>' and len(self._grammar['<start>']) > 1:
                 # NOTE: ISLa assumes the start rule to be a singleton
@@ -199,6 +217,28 @@ class GrammarBuilder:
         self._next_counter += 1
         return fresh_name
 
+    def _group(self, alternatives: list[str]) -> str:
+        """A nonterminal deriving `alternatives`, shared by structurally equal groups."""
+        key = tuple(alternatives)
+        if key not in self._groups:
+            group = self._fresh_nonterminal()
+            self._grammar[group] = alternatives
+            self._groups[key] = group
+        return self._groups[key]
+
+    def _optional_chain(self, elem: str, depth: int) -> str:
+        """A nonterminal deriving 0 to `depth` copies of `elem`, via rules `R_k: "" | elem R_{k-1}`.
+        Its size is linear in `depth`, whereas listing every count as an alternative is quadratic."""
+        tail = ''
+        for k in range(1, depth + 1):
+            key = (elem, k)
+            if key not in self._chains:
+                chain = self._fresh_nonterminal()
+                self._grammar[chain] = ['', elem + tail]
+                self._chains[key] = chain
+            tail = self._chains[key]
+        return tail
+
     def _convert(self, clause: Clause) -> list[str]:
         match clause:
             case Token(Lit(str() as text, _)):
@@ -217,37 +257,46 @@ class GrammarBuilder:
                     return [quoted]
                 return [text]
             case Symbol(Ident(name, _)):
-                return [f'<{name}>']
+                return [nonterminal_of(name)]
             case CharRange() as cs:
-                return [chr(code) for code in cs.get_range]
+                return list(expand_range(cs.begin, cs.end))
             case Rep(clause, rep_range):
                 match self._convert(clause):
                     case [c]:
                         elem = c  # inline
-                    case cs:
-                        elem = self._fresh_nonterminal()
-                        self._grammar[elem] = cs
+                    case alts:
+                        elem = self._group(alts)
 
                 k1 = rep_range.lower
                 k2 = rep_range.upper
-                if k2:  # finite
-                    return [elem * k for k in range(k1, k2 + 1)]
-                else:  # infinite
-                    elems = self._fresh_nonterminal()
-                    self._grammar[elems] = [elem * k1, elem + elems]
-                    return [elems]
+                if k2 and k2 - k1 >= 2:  # finite, wide: k1 copies then a chain of optional ones
+                    return [elem * k1 + self._optional_chain(elem, k2 - k1)]
+                elif k2:  # finite, narrow: each alternative extends the previous one by one `elem`
+                    alternatives = [elem * k1]
+                    for _ in range(k2 - k1):
+                        alternatives.append(alternatives[-1] + elem)
+                    return alternatives
+                else:  # infinite: shared by all repetitions of the same `elem` and lower bound
+                    key = (elem, k1)
+                    if key not in self._loops:
+                        elems = self._fresh_nonterminal()
+                        self._grammar[elems] = [elem * k1, elem + elems]
+                        self._loops[key] = elems
+                    return [self._loops[key]]
             case Seq(clauses):
-                concat = ''
+                parts = []
                 for clause in clauses:
                     match self._convert(clause):
                         case [c]:
-                            concat += c
-                        case cs:
-                            group = self._fresh_nonterminal()
-                            self._grammar[group] = cs
-                            concat += group
-                return [concat]
+                            parts.append(c)
+                        case alts:
+                            parts.append(self._group(alts))
+                return [''.join(parts)]
             case Alt(clauses):
-                return [c for clause in clauses for c in self._convert(clause)]
+                alternatives = []
+                extend = alternatives.extend
+                for clause in clauses:
+                    extend(self._convert(clause))
+                return alternatives
             case other:
                 raise NotImplementedError(other.__class__.__name__)
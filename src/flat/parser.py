@@ -1,4 +1,5 @@
 # whitespaces and comments
+from functools import lru_cache
 from string import digits, ascii_letters, punctuation
 from traceback import FrameSummary
 from typing import Any, Tuple
@@ -54,7 +55,11 @@ hex_integer = skip_whitespaces >> (decimal_digit | char_from('AaBbCcDdEeFf')).at
 boolean = skip_whitespaces >> (text('true').result(True) | text('false').result(False))
 
 
+@lru_cache(maxsize=1024)
 def unquote(raw: str) -> str:
+    if '\\' not in raw:  # no escapes: the quoted text is the value itself
+        return raw[1:-1]
+
     import ast
     e = ast.parse(raw).body[0]
     assert isinstance(e, ast.Expr) and isinstance(e.value, ast.Constant)
@@ -1,5 +1,7 @@
 import ast
 from dataclasses import dataclass
+from functools import lru_cache, cached_property
+from types import CodeType, MappingProxyType
 from typing import Any, Callable, Generator, Tuple, Literal
 
 import flat.parser
@@ -7,54 +9,74 @@ from flat.types import *
 from flat.typing import LangType, RefinementType, Cond, BuiltinType, Value, ListType
 
 
+# NOTE: read-only, as grammars are shared by every lang built on top of them
+builtin_grammars: MappingProxyType[str, Grammar] = MappingProxyType({
+    'RFC_Email': RFC_Email.grammar,
+    'RFC_URL': RFC_URL.grammar,
+    'Host': Host.grammar,
+    'URL': URL.grammar,
+})
+
+
 class LangBuilder(GrammarBuilder):
     def lookup_lang(self, name: str) -> Optional[Grammar]:
-        match name:
-            case 'RFC_Email':
-                return RFC_Email.grammar
-            case 'RFC_URL':
-                return RFC_URL.grammar
-            case 'Host':
-                return Host.grammar
-            case 'URL':
-                return URL.grammar
+        grammar = builtin_grammars.get(name)
+        if grammar is not None:
+            return grammar
+
+        try:
+            value = eval(name)
+        except NameError:
+            return None
+
+        match value:
+            case LangType(g):
+                return g
             case _:
-                try:
-                    value = eval(name)
-                except NameError:
-                    return None
+                return None
+
 
-                match value:
-                    case LangType(g):
-                        return g
-                    case _:
-                        return None
+lang_cache: dict[Tuple[str, str], LangType] = {}
 
 
 def lang(name: str, rules: str) -> LangType:
-    builder = LangBuilder()
-    grammar = builder(name, parse_using(flat.parser.rules, rules, '<file>', (1, 1)))
-    return LangType(grammar)
+    key = (name, rules)
+    if key not in lang_cache:
+        builder = LangBuilder()
+        grammar = builder(name, parse_using(flat.parser.rules, rules, '<file>', (1, 1)))
+        lang_cache[key] = LangType(grammar)
+    return lang_cache[key]
+
+
+@lru_cache(maxsize=1024)
+def parse_cond(code: str) -> ast.expr:
+    """Parse a refinement condition. Identical conditions share one (read-only) tree."""
+    match ast.parse(code).body[0]:
+        case ast.Expr(expr):
+            return expr
+        case _:
+            raise TypeError
 
 
 class PyCond(Cond):
     expr: ast.expr
 
     def __init__(self, code: str):
-        match ast.parse(code).body[0]:
-            case ast.Expr(expr):
-                self.expr = expr
-            case _:
-                raise TypeError
+        self.expr = parse_cond(code)
 
     def __and__(self, other):
         if isinstance(other, PyCond):
             return PyCond(ast.And([self.expr, other.expr]))
         raise TypeError
 
+    @cached_property
+    def code(self) -> CodeType:
+        """The compiled condition, reused by every `apply`."""
+        return compile(ast.unparse(self.expr), '<string>', 'eval')
+
     def apply(self, value: Value) -> bool:
         env = sys.modules['_.source'].__dict__
-        match eval(ast.unparse(self.expr), env, {'_': value}):
+        match eval(self.code, env, {'_': value}):
             case bool() as b:
                 return b
             case _:
@@ -64,12 +86,18 @@ class PyCond(Cond):
         return ast.unparse(self.expr)
 
 
+builtin_types: dict[type, BuiltinType] = {
+    int: BuiltinType.Int,
+    bool: BuiltinType.Bool,
+    str: BuiltinType.String,
+}
+
+
 def refine(base_type: type | LangType | RefinementType, refinement: str) -> RefinementType:
     cond = PyCond(refinement)
     match base_type:
-        case type() as ty if ty in [int, bool, str]:
-            return RefinementType(
-                BuiltinType.Int if ty == int else BuiltinType.Bool if ty == bool else BuiltinType.String, cond)
+        case type() as ty if ty in builtin_types:
+            return RefinementType(builtin_types[ty], cond)
         case LangType() as t:
             return RefinementType(t, cond)
         case RefinementType(base, base_cond):
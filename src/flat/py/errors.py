@@ -34,9 +34,9 @@ def _extract_stack(exc: Exception, drop: int = 0) -> list[FrameSummary]:
 
     summaries = []
     for frame, lineno in stack:
-        if '__line__' in frame.f_locals:
+        line = frame.f_locals.get('__line__')  # NOTE: every f_locals access syncs a fresh snapshot: fetch once
+        if line is not None:
             source = frame.f_globals['__source__']
-            line = frame.f_locals['__line__']
         else:
             source = frame.f_code.co_filename
             line = lineno
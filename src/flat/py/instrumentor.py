@@ -1,7 +1,10 @@
-from typing import get_origin, Literal
+from copy import copy
+from functools import cached_property, lru_cache
+from itertools import chain
+from typing import get_origin, Iterator, Literal
 
 from flat.py import fuzz as fuzz_annot, PyCond
-from flat.py.rewrite import cnf, ISLaConvertor, free_vars, subst
+from flat.py.rewrite import cnf, ISLaConvertor, TypeDispatch, free_vars, subst
 from flat.py.runtime import *
 from flat.py.utils import classify
 from flat.typing import Type, RefinementType, LiteralType
@@ -17,7 +20,7 @@ class FunSig:
     preconditions: list[ast.expr]  # bind params
     postconditions: list[ast.expr]  # bind params and '_' for return value
 
-    @property
+    @cached_property
     def param_names(self) -> list[str]:
         return [x for x, _, _ in self.params]
 
@@ -28,14 +31,31 @@ class FunContext:
         self.annots = annots
 
 
+# NOTE: expression contexts carry no state, so a single instance of each is shared by all generated nodes
+load_ctx = ast.Load()
+store_ctx = ast.Store()
+
+
+@lru_cache(maxsize=None)
 def load(name: str) -> ast.Name:
-    return ast.Name(name, ctx=ast.Load())
+    # NOTE: generated nodes are never rewritten, so one node per name can be shared
+    return ast.Name(name, ctx=load_ctx)
+
+
+@lru_cache(maxsize=None)
+def store(name: str) -> ast.Name:
+    return ast.Name(name, ctx=store_ctx)
 
 
 def const(value: int | str | None) -> ast.Constant:
+    if value is None:
+        return none_const
     return ast.Constant(value)
 
 
+none_const = ast.Constant(None)
+
+
 def conjunction(conjuncts: list[ast.expr]) -> ast.expr:
     match conjuncts:
         case []:
@@ -46,11 +66,11 @@ def conjunction(conjuncts: list[ast.expr]) -> ast.expr:
             return ast.BoolOp(ast.And(), conjuncts)
 
 
-def assign(var: str, value: ast.expr | int) -> ast.stmt:
-    if isinstance(value, int):
+def assign(var: str, value: ast.expr | int | str) -> ast.stmt:
+    if isinstance(value, (int, str)):
         value = ast.Constant(value)
 
-    return ast.Assign([ast.Name(var, ctx=ast.Store())], value)
+    return ast.Assign([store(var)], value)
 
 
 def apply(fun: str | ast.expr, *args: int | str | ast.expr) -> ast.Call:
@@ -58,13 +78,10 @@ def apply(fun: str | ast.expr, *args: int | str | ast.expr) -> ast.Call:
         fun = load(fun)
     exprs = []
     for arg in args:
-        match arg:
-            case int() as n:
-                exprs += [ast.Constant(n)]
-            case str() as s:
-                exprs += [ast.Constant(s)]
-            case ast.expr() as e:
-                exprs += [e]
+        if isinstance(arg, ast.expr):
+            exprs.append(arg)
+        elif isinstance(arg, (int, str)):
+            exprs.append(ast.Constant(arg))
     return ast.Call(fun, exprs, keywords=[])
 
 
@@ -72,15 +89,24 @@ def lambda_expr(args: list[str], body: ast.expr) -> ast.Lambda:
     return ast.Lambda(ast.arguments([], [ast.arg(x) for x in args], None, [], [], None, []), body)
 
 
+@lru_cache(maxsize=None)
+def flat_attr(name: str) -> ast.Attribute:
+    """`__flat__.<name>`, shared by all calls to the same runtime function."""
+    return ast.Attribute(load('__flat__'), name, ctx=load_ctx)
+
+
 def apply_flat(fun: Callable, *args: int | str | ast.expr) -> ast.Call:
-    return apply(ast.Attribute(load('__flat__'), fun.__name__, ctx=ast.Load()), *args)
+    exprs = [arg if isinstance(arg, ast.expr) else ast.Constant(arg) for arg in args]
+    return ast.Call(flat_attr(fun.__name__), exprs, keywords=[])
 
 
 def call_flat(fun: Callable, *args: int | str | ast.expr) -> ast.Expr:
     return ast.Expr(apply_flat(fun, *args))
 
 
+@lru_cache(maxsize=1024)
 def parse_expr(code: str) -> ast.expr:
+    """Parse an expression. Identical conditions share one tree: copy it before setting attributes."""
     match ast.parse(code).body[0]:
         case ast.Expr(expr):
             return expr
@@ -98,11 +124,27 @@ def canonical_cond(condition: ast.expr, binders: list[str]) -> ast.expr:
             raise TypeError
 
 
+# expressions that are cheap and free of effects to evaluate again
+trivially_pure = frozenset({ast.Constant, ast.Name})
+
+
+def checked_value(value: ast.expr, var: str) -> ast.expr:
+    """The expression to type check after `var = value`: `value` itself if it is trivially pure;
+    otherwise `var`, so that `value` is not evaluated a second time."""
+    if type(value) in trivially_pure:
+        return value
+    return load(var)
+
+
 def get_loc(node: ast.AST) -> ast.expr:
     return apply_flat(Loc, node.lineno, node.col_offset, node.end_lineno, node.end_col_offset)
 
 
-class Instrumentor(ast.NodeTransformer):
+# `from flat.py import runtime as __flat__`: the same for every instrumented module
+import_runtime = ast.ImportFrom('flat.py', [ast.alias('runtime', '__flat__')], 0)
+
+
+class Instrumentor(TypeDispatch, ast.NodeTransformer):
     def __init__(self) -> None:
         # self._inside_body = False
         self._last_lineno = 0
@@ -113,6 +155,7 @@ class Instrumentor(ast.NodeTransformer):
     def __call__(self, source: str, code: str) -> str:
         self._env: dict[str, Any] = {}
         exec(code, {}, self._env)
+        self._expanded: dict[str, Optional[Type]] = {}
 
         tree = ast.parse(code)
         self._last_lineno = 0
@@ -123,33 +166,36 @@ class Instrumentor(ast.NodeTransformer):
         except InstrumentError as err:
             err.print()
 
-        import_runtime = ast.parse('from flat.py import runtime as __flat__').body[0]
-        set_source = ast.parse(f'__source__ = "{self.filename}"').body[0]
-        tree.body.insert(0, import_runtime)
-        tree.body.insert(1, set_source)
-        tree.body.insert(2, call_flat(load_source_module, ast.Name('__source__')))
+        set_source = assign('__source__', self.filename)
+        tree.body[:0] = [import_runtime, set_source, call_flat(load_source_module, load('__source__'))]
         tree.body.append(call_flat(run_main, load('main')))
         ast.fix_missing_locations(tree)
         return ast.unparse(tree)
 
     def track_lineno(self, lineno: int) -> list[ast.stmt]:
         # assert self._inside_body
-        body = []
-        if lineno != self._last_lineno:
-            body += [assign('__line__', lineno)]
-            self._last_lineno = lineno
+        if lineno == self._last_lineno:
+            return []
 
-        return body
+        self._last_lineno = lineno
+        return [ast.Assign([store('__line__')], ast.Constant(lineno))]
 
     def expand(self, annot: ast.expr) -> Optional[Type]:
-        match eval(ast.unparse(annot), {}, self._env):
+        # NOTE: `self._env` is fixed during one instrumentation, so equal annotations expand to the same type
+        key = ast.unparse(annot)
+        if key not in self._expanded:
+            self._expanded[key] = self._expand(key)
+        return self._expanded[key]
+
+    def _expand(self, annot: str) -> Optional[Type]:
+        match eval(annot, {}, self._env):
             case Type() as typ:
                 return typ
             case other:
                 if get_origin(other) is Literal:  # literal type
                     values = get_args(other)
                     assert len(values) > 0
-                    assert all(isinstance(v, int) or isinstance(v, bool) or isinstance(v, str) for v in values)
+                    assert all(isinstance(v, (int, str)) for v in values)  # NOTE: bool is a subclass of int
                     return LiteralType(values)
                 return None
 
@@ -190,21 +236,30 @@ class Instrumentor(ast.NodeTransformer):
 
         # check arg types
         params: list[Tuple[str, Optional[Type], Optional[ast.expr]]] = []
+        arg_checks: list[Tuple[str, int, ast.expr]] = []  # param name, position, annotation
+        arg_names: list[str] = []
         for arg in node.args.args:
             x = arg.arg
+            arg_names.append(x)
             if arg.annotation:
                 typ = self.expand(arg.annotation)
                 if typ:
                     annots[x] = arg.annotation
-                    body += [call_flat(assert_arg_type, load(x), len(params), node.name, arg.annotation)]
+                    arg_checks.append((x, len(params), arg.annotation))
             else:
                 typ = None
             params.append((x, typ, arg.annotation))
 
+        if len(arg_checks) == 1:
+            x, k, annot = arg_checks[0]
+            body += [call_flat(assert_arg_type, load(x), k, node.name, annot)]
+        elif len(arg_checks) > 1:  # one runtime call for all args
+            checks: list[ast.expr] = [ast.Tuple([load(x), const(k), annot]) for x, k, annot in arg_checks]
+            body += [call_flat(assert_arg_types, ast.List(checks), node.name)]
+
         # record default value
-        defaults: dict[str, Optional[ast.expr]] = {}
-        for (x, _, _), default in zip(reversed(params), reversed(node.args.defaults)):
-            defaults[x] = default
+        # NOTE: defaults belong to the last params
+        defaults: dict[str, Optional[ast.expr]] = dict(zip(reversed(arg_names), reversed(node.args.defaults)))
 
         # check return type
         if node.returns:
@@ -219,10 +274,13 @@ class Instrumentor(ast.NodeTransformer):
         # check specifications
         preconditions: list[ast.expr] = []
         postconditions: list[ast.expr] = []
-        exc_info: list[ast.Tuple] = []  # cond_var name, exc_type, loc
+        exc_info: list[ast.expr] = []  # cond_var name, exc_type, loc
         processed: list[ast.expr] = []
-        arg_names = [x for x, _, _ in params]
         for decorator in node.decorator_list:
+            if (type(decorator) is not ast.Call or type(decorator.func) is not ast.Name or
+                    decorator.func.id not in spec_decorators):
+                continue
+
             match decorator:
                 case ast.Call(ast.Name('requires'), [condition]):
                     pre = canonical_cond(condition, arg_names)
@@ -232,7 +290,7 @@ class Instrumentor(ast.NodeTransformer):
                                        ast.List([ast.Tuple([const(x), load(x)]) for x in arg_names]), node.name)]
                     processed.append(decorator)  # to remove it
                 case ast.Call(ast.Name('ensures'), [condition]):
-                    post = canonical_cond(condition, arg_names + ['_'])
+                    post = copy(canonical_cond(condition, arg_names + ['_']))  # may be shared: see parse_expr
                     post.lineno = decorator.lineno
                     postconditions.append(post)
                     processed.append(decorator)  # to remove it
@@ -264,16 +322,19 @@ class Instrumentor(ast.NodeTransformer):
             body_buffer = body
 
         self._stack.append(FunContext(sig, annots))
+        visit = self.visit
+        extend = body_buffer.extend
+        append = body_buffer.append
         for stmt in node.body:
-            match self.visit(stmt):
-                case ast.stmt() as s:
-                    body_buffer.append(s)
-                case list() as ss:
-                    body_buffer += ss
+            result = visit(stmt)
+            if isinstance(result, list):
+                extend(result)
+            elif isinstance(result, ast.stmt):
+                append(result)
         self._stack.pop()
 
         if len(exc_info) > 0:
-            handler = apply_flat(ExpectExceptions, ast.List([t for t in exc_info]))
+            handler = apply_flat(ExpectExceptions, ast.List(exc_info))
             with_item = ast.withitem(handler)
             with_stmt = ast.With([with_item], body_buffer, type_ignores=[])
             body.append(with_stmt)
@@ -288,10 +349,18 @@ class Instrumentor(ast.NodeTransformer):
         ctx = self._stack[-1]
         body = self.track_lineno(node.lineno)
         body += [node]
+        if len(ctx.annots) == 0:
+            return body
+
+        loc = None
         for target in node.targets:
             for var in vars_in_target(target):
-                if var in ctx.annots:
-                    body += [call_flat(assert_type, node.value, get_loc(node.value), ctx.annots[var])]
+                annot = ctx.annots.get(var)
+                if annot is not None:
+                    if loc is None:
+                        loc = get_loc(node.value)
+                    value = checked_value(node.value, var) if type(target) is ast.Name else node.value
+                    body += [call_flat(assert_type, value, loc, annot)]
 
         return body
 
@@ -308,7 +377,9 @@ class Instrumentor(ast.NodeTransformer):
             case ast.Name(var):
                 if self.expand(node.annotation) is not None:
                     ctx.annots[var] = node.annotation
-                    body += [call_flat(assert_type, node.value, get_loc(node.value), ctx.annots[var])]
+                    if node.value is not None:  # a bare declaration has nothing to check yet
+                        body += [call_flat(assert_type, checked_value(node.value, var), get_loc(node.value),
+                                           node.annotation)]
             case _:
                 raise TypeError
 
@@ -322,10 +393,14 @@ class Instrumentor(ast.NodeTransformer):
         ctx = self._stack[-1]
         body = self.track_lineno(node.lineno)
         body += [node]
+        if len(ctx.annots) == 0:
+            return body
+
         match node.target:
             case ast.Name(var):
-                if var in ctx.annots:
-                    body += [call_flat(assert_type, node.value, get_loc(node.value), ctx.annots[var])]
+                annot = ctx.annots.get(var)
+                if annot is not None:
+                    body += [call_flat(assert_type, node.value, get_loc(node.value), annot)]
 
         return body
 
@@ -333,7 +408,7 @@ class Instrumentor(ast.NodeTransformer):
         if node.value:
             node.value = self.visit(node.value)
         else:
-            node.value = const(None)
+            node.value = ast.Constant(None)  # not the shared `none_const`: this node belongs to the user's code
 
         ctx = self._stack[-1]
         body = self.track_lineno(node.lineno)
@@ -341,20 +416,25 @@ class Instrumentor(ast.NodeTransformer):
             return body + [node]
 
         body += [assign('__return__', node.value)]
+        loc = get_loc(node.value)
         if ctx.fun.returns:
-            body += [call_flat(assert_type, load('__return__'), get_loc(node.value), ctx.fun.returns[1])]
-
-        arg_names = [x for x in ctx.fun.param_names]
-        for cond in ctx.fun.postconditions:  # note: return value is '_' in cond
-            body += self.track_lineno(cond.lineno)
-            body += [call_flat(assert_post, subst(cond, {'_': load('__return__')}),
-                               ast.List([ast.Tuple([const(x), load(x)]) for x in arg_names]),
-                               load('__return__'), get_loc(node.value), const(ctx.fun.name))]
+            body += [call_flat(assert_type, load('__return__'), loc, ctx.fun.returns[1])]
+
+        if len(ctx.fun.postconditions) > 0:
+            args = ast.List([ast.Tuple([const(x), load(x)]) for x in ctx.fun.param_names])
+            name = const(ctx.fun.name)
+            for cond in ctx.fun.postconditions:  # note: return value is '_' in cond
+                body += self.track_lineno(cond.lineno)
+                body.append(call_flat(assert_post, subst(cond, {'_': load('__return__')}), args,
+                                      load('__return__'), loc, name))
         body += self.track_lineno(node.lineno)
-        body += [ast.Return(load('__return__'))]
+        body.append(ast.Return(load('__return__')))
         return body
 
     def visit_Call(self, node: ast.Call):
+        if type(node.func) is not ast.Name or node.func.id not in special_calls:
+            return super().generic_visit(node)
+
         match node:
             case ast.Call(ast.Name('isinstance'), [obj, typ]) if self.expand(typ) is not None:
                 return apply_flat(has_type, obj, typ)
@@ -424,17 +504,21 @@ class Instrumentor(ast.NodeTransformer):
     def generic_visit(self, node: ast.AST):
         if isinstance(node, ast.stmt):
             body = self.track_lineno(node.lineno)
-            match super().generic_visit(node):
-                case ast.stmt() as s:
-                    body.append(s)
-                case list() as ss:
-                    body += ss
+            if type(node) in leaf_stmts:
+                body.append(node)
+                return body
+
+            result = super().generic_visit(node)
+            if isinstance(result, list):
+                body.extend(result)
+            elif isinstance(result, ast.stmt):
+                body.append(result)
             return body
 
         return super().generic_visit(node)
 
     def _producer(self, fun: FunSig, using_producers: dict[str, ast.expr]) -> ast.expr:
-        pre_conjuncts = [c for pre in fun.preconditions for c in cnf(pre)]
+        pre_conjuncts = list(chain.from_iterable(map(cnf, fun.preconditions)))
         convert = ISLaConvertor(self._env)
 
         producers: list[ast.expr] = []
@@ -456,8 +540,8 @@ class Instrumentor(ast.NodeTransformer):
 
                 # pick conjuncts that could be written in the refinement position
                 # i.e., it is a predicate over the param x only
-                picked, pre_conjuncts = classify(lambda c: free_vars(c) & (set(fun.param_names) - {x}) == set(),
-                                                 pre_conjuncts)
+                other_params = set(fun.param_names) - {x}
+                picked, pre_conjuncts = classify(lambda c: free_vars(c).isdisjoint(other_params), pre_conjuncts)
                 for cond in picked:
                     match convert(cond, x):
                         case None:
@@ -475,7 +559,7 @@ class Instrumentor(ast.NodeTransformer):
 
                 assert annot is not None
                 if isinstance(typ, RefinementType):
-                    annot = ast.Attribute(annot, 'base', ctx=ast.Load())
+                    annot = ast.Attribute(annot, 'base', ctx=load_ctx)
                 producers += [
                     apply_flat(producer,
                                apply_flat(isla_generator, annot, formula),
@@ -493,11 +577,21 @@ class Instrumentor(ast.NodeTransformer):
                           lambda_expr(fun.param_names, conjunction(pre_conjuncts)))
 
 
-def vars_in_target(expr: ast.expr) -> list[str]:
-    match expr:
-        case ast.Name(x):
-            return [x]
-        case ast.Tuple(es):
-            return [x for e in es for x in vars_in_target(e)]
-        case _:
-            return []
+# calls rewritten by `Instrumentor.visit_Call`
+special_calls = frozenset({'isinstance', 'fuzz'})
+
+# statements without nested statements or expressions: `generic_visit` need not descend into them
+leaf_stmts = frozenset({ast.Pass, ast.Break, ast.Continue, ast.Import, ast.ImportFrom, ast.Global, ast.Nonlocal})
+
+# names of the decorators that specify a function
+spec_decorators = frozenset({'requires', 'ensures', 'returns', 'raise_if'})
+
+
+def vars_in_target(expr: ast.expr) -> Iterator[str]:
+    stack = [expr]
+    while len(stack) > 0:
+        match stack.pop():
+            case ast.Name(x):
+                yield x
+            case ast.Tuple(es):
+                stack.extend(reversed(es))
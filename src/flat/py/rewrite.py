@@ -14,22 +14,48 @@ def negate(cond: ast.expr) -> ast.expr:
 
 def cnf(cond: ast.expr) -> list[ast.expr]:
     """Convert a condition into conjunctive normal form. Return the list of conjuncts."""
-    match cond:
-        case ast.BoolOp(ast.And(), operands):  # p and q
-            return [c for e in operands for c in cnf(e)]
-        case ast.UnaryOp(ast.Not(), ast.BoolOp(ast.Or(), operands)):  # not (p or q) = (not p) and (not q)
-            return [c for e in operands for c in cnf(negate(e))]
-        case atomic:
-            return [atomic]
-
-
-class FreeVarCollector(ast.NodeVisitor):
-    def __call__(self, tree: ast.expr) -> frozenset[str]:
+    conjuncts = []
+    stack = [cond]  # operands are pushed in reverse so that conjuncts come out left to right
+    while len(stack) > 0:
+        match stack.pop():
+            case ast.BoolOp(ast.And(), operands):  # p and q
+                stack.extend(reversed(operands))
+            case ast.UnaryOp(ast.Not(), ast.BoolOp(ast.Or(), operands)):  # not (p or q) = (not p) and (not q)
+                stack.extend(negate(e) for e in reversed(operands))
+            case atomic:
+                conjuncts.append(atomic)
+    return conjuncts
+
+
+class TypeDispatch(ast.NodeVisitor):
+    """Dispatch `visit` through a table from node type to `visit_<type>` method, built once per class,
+    rather than looking up the method by name on every node."""
+    handlers: dict[type, Callable[[Any, Any], Any]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        handlers = {}
+        for name in dir(cls):
+            if name.startswith('visit_'):
+                node_type = getattr(ast, name.removeprefix('visit_'), None)
+                if isinstance(node_type, type):
+                    handlers[node_type] = getattr(cls, name)
+        cls.handlers = handlers
+
+    def visit(self, node: ast.AST) -> Any:
+        handler = self.handlers.get(type(node))
+        if handler is None:
+            return self.generic_visit(node)
+        return handler(self, node)
+
+
+class FreeVarCollector(TypeDispatch):
+    def __call__(self, tree: ast.expr) -> set[str]:
         """Collect the set of free variable names in an expression."""
         self._free: set[str] = set()
         self._bound: list[list[str]] = []
         self.visit(tree)
-        return frozenset(self._free)
+        return self._free
 
     def visit_Name(self, node: ast.Name):
         if all(node.id not in bound for bound in self._bound):
@@ -42,10 +68,10 @@ class FreeVarCollector(ast.NodeVisitor):
         self._bound.pop()
 
 
-free_vars: Callable[[ast.expr], frozenset[str]] = FreeVarCollector()
+free_vars: Callable[[ast.expr], set[str]] = FreeVarCollector()
 
 
-class Substitution(ast.NodeTransformer):
+class Substitution(TypeDispatch, ast.NodeTransformer):
     def __call__(self, tree: ast.expr, subst_map: dict[str, ast.expr]) -> ast.expr:
         """Substitute free vars in an expression."""
         self._subst_map = subst_map
@@ -77,6 +103,12 @@ class ISLaType(Enum):
     String = 2
 
 
+# python operator type -> isla operator
+isla_connectives: dict[type, str] = {ast.And: ' and ', ast.Or: ' or '}
+isla_arith_ops: dict[type, str] = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Mod: '%'}
+isla_compare_ops: dict[type, str] = {ast.Eq: '=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.In: 'in'}
+
+
 class ISLaConvertor:
     def __init__(self, env: dict[str, Any]) -> None:
         self._env: dict[str, Any] = env
@@ -110,13 +142,7 @@ class ISLaConvertor:
 
             # boolean expressions
             case ast.BoolOp(op, operands):
-                match op:
-                    case ast.And():
-                        connective = ' and '
-                    case ast.Or():
-                        connective = ' or '
-                    case _:
-                        assert False
+                connective = isla_connectives[type(op)]
                 results = [self.to_isla(e) for e in operands]
                 if all(isinstance(result, tuple) and result[1] == ISLaType.Formula for result in results):
                     formulae = [f for f, _ in results]  # type: ignore
@@ -128,19 +154,9 @@ class ISLaConvertor:
 
             # arithmetic expressions, string concat (+)
             case ast.BinOp(left, op, right):
-                match op:
-                    case ast.Add():
-                        smt_op = '+'
-                    case ast.Sub():
-                        smt_op = '-'
-                    case ast.Mult():
-                        smt_op = '*'
-                    case ast.Div():
-                        smt_op = '/'
-                    case ast.Mod():
-                        smt_op = '%'
-                    case _:  # unsupported
-                        return None
+                smt_op = isla_arith_ops.get(type(op))
+                if smt_op is None:  # unsupported
+                    return None
                 match self.to_isla(left), self.to_isla(right):
                     case (lhs, ISLaType.Int), (rhs, ISLaType.Int):
                         return f'({smt_op} {lhs} {rhs})', ISLaType.Int
@@ -155,21 +171,9 @@ class ISLaConvertor:
 
             # comparison expressions, string comparison (<=), string contains (in)
             case ast.Compare(left, [op], [right]):
-                match op:
-                    case ast.Eq():
-                        smt_op = '='
-                    case ast.Lt():
-                        smt_op = '<'
-                    case ast.LtE():
-                        smt_op = '<='
-                    case ast.Gt():
-                        smt_op = '>'
-                    case ast.GtE():
-                        smt_op = '>='
-                    case ast.In():
-                        smt_op = 'in'
-                    case _:  # unsupported
-                        return None
+                smt_op = isla_compare_ops.get(type(op))
+                if smt_op is None:  # unsupported
+                    return None
                 match self.to_isla(left), self.to_isla(right):
                     case (lhs, ISLaType.Int), (rhs, ISLaType.Int) if smt_op != 'in':
                         return f'({smt_op} {lhs} {rhs})', ISLaType.Formula
@@ -263,7 +267,7 @@ class ISLaConvertor:
                             case (string, ISLaType.String), (suffix, ISLaType.String):
                                 return f'(str.suffixof {suffix} {string})', ISLaType.Formula
                     case 'find' | 'index', _:  # `index` raises error if the pattern is not found
-                        if len(args) not in [1, 2]:  # unsupported
+                        if len(args) not in (1, 2):  # unsupported
                             return None
                         match self.to_isla(receiver), self.to_isla(args[0]):
                             case (string, ISLaType.String), (pattern, ISLaType.String):
@@ -3,6 +3,7 @@ import importlib.util
 import inspect
 import sys
 import time
+from functools import lru_cache
 from types import TracebackType
 from typing import Any, Callable, Generator, Optional, get_args
 
@@ -21,6 +22,12 @@ def load_source_module(path: str) -> None:
     spec.loader.exec_module(source_module)
 
 
+@lru_cache(maxsize=None)
+def literal_values(expected: Any) -> frozenset:
+    """The values of a literal type, as a set for constant-time membership tests."""
+    return frozenset(get_args(expected))
+
+
 def has_type(obj: Any, expected: Any) -> bool:
     if isinstance(expected, Type):
         match obj:
@@ -35,8 +42,10 @@ def has_type(obj: Any, expected: Any) -> bool:
             case _:
                 raise RuntimeError(f'cannot check type for object {obj} with type {type(obj)}')
     else:  # Literal
-        values = get_args(expected)
-        return obj in values
+        try:
+            return obj in literal_values(expected)
+        except TypeError:  # unhashable, thus not a literal value
+            return False
 
 
 def assert_type(value: Any, value_loc: Loc, expected_type: Type):
@@ -49,6 +58,13 @@ def assert_arg_type(value: Any, k: int, of_method: str, expected_type: Type):
         raise ArgTypeMismatch(str(expected_type), show_value(value), k, of_method)
 
 
+def assert_arg_types(args: list[Tuple[Any, int, Type]], of_method: str):
+    """Check several arguments in one call: `args` holds (value, index, expected type) triples."""
+    for value, k, expected_type in args:
+        if not has_type(value, expected_type):  # NOTE: raise here, so the stack depth is as for `assert_arg_type`
+            raise ArgTypeMismatch(str(expected_type), show_value(value), k, of_method)
+
+
 def assert_pre(cond: bool, args: list[Tuple[str, Any]], of_method: str):
     if not cond:
         raise PreconditionViolated(of_method, [(name, show_value(v)) for name, v in args])
@@ -148,8 +164,9 @@ def fuzz(target: Callable, times: int, args_producer: Gen, verbose: bool = False
     # copy __source__, __line__ from the last frame
     frame = inspect.currentframe()
     back_frame = frame.f_back
-    if '__line__' in back_frame.f_locals:
-        frame.f_locals['__line__'] = back_frame.f_locals['__line__']
+    line = back_frame.f_locals.get('__line__')
+    if line is not None:
+        frame.f_locals['__line__'] = line
         frame.f_globals['__source__'] = back_frame.f_globals['__source__']
 
     producer_time = 0.0
@@ -4,6 +4,7 @@ from isla.derivation_tree import DerivationTree
 from isla.helpers import is_nonterminal
 from parsy import string, seq, decimal_digit, regex
 
+from flat.grammars import nonterminal_of
 from flat.typing import LangType
 
 
@@ -43,12 +44,12 @@ class XPath:
 
 
 def children_labelled_with(tree: DerivationTree, symbol: str) -> list[DerivationTree]:
-    nonterminal = f'<{symbol}>'
+    nonterminal = nonterminal_of(symbol)
     children = []
     for node in tree.children:
         if is_nonterminal(node.value):
             if node.value.startswith('<-'):  # intermediate node: skip and collect in its children
-                children += children_labelled_with(node, nonterminal)
+                children += children_labelled_with(node, symbol)
             elif node.value == nonterminal:
                 children += [node]
     return children
@@ -70,7 +71,7 @@ def select_by_xpath(tree: DerivationTree, path: XPath) -> list[DerivationTree]:
                 case XPathSelectAllDirect(symbol):
                     new += children_labelled_with(parent, symbol)
                 case XPathSelectAllIndirect(symbol):
-                    nonterminal = f'<{symbol}>'
+                    nonterminal = nonterminal_of(symbol)
                     new += [node for _, node in parent.filter(lambda node: node.value == nonterminal)]
         old = new
 
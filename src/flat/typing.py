@@ -15,13 +15,15 @@ class Cond:
 
 
 class Type:
+    __slots__ = ()
+
     @property
     def is_lang_type(self) -> bool:
         return False
 
 
 class BaseType(Type):
-    pass
+    __slots__ = ()
 
 
 class BuiltinType(BaseType, Enum):
@@ -30,7 +32,7 @@ class BuiltinType(BaseType, Enum):
     String = 2
 
 
-@dataclass
+@dataclass(slots=True)
 class LangType(BaseType):
     grammar: Grammar
 
@@ -41,7 +43,7 @@ class LangType(BaseType):
         return self.grammar.name
 
 
-@dataclass
+@dataclass(slots=True)
 class RefinementType(Type):
     base: BaseType
     cond: Cond
@@ -53,7 +55,7 @@ class RefinementType(Type):
         return '{' + f'{self.base} | {self.cond}' + '}'
 
 
-@dataclass
+@dataclass(slots=True)
 class LiteralType(Type):
     values: list[Union[int, bool, str]]
 
@@ -61,7 +63,7 @@ class LiteralType(Type):
         return 'Literal[' + ', '.join(map(str, self.values)) + ']'
 
 
-@dataclass
+@dataclass(slots=True)
 class ListType(Type):
     elem_type: Type
 
@@ -82,17 +84,18 @@ def get_base_type(typ: Type) -> BuiltinType:
             return get_base_type(b)
 
 
+builtin_classes: dict[BuiltinType, type] = {
+    BuiltinType.Int: int,  # NOTE: bool values are ints as well
+    BuiltinType.Bool: bool,
+    BuiltinType.String: str,
+}
+
+
 def value_has_type(value: Value, typ: Type) -> bool:
-    match value, typ:
-        case int(), BuiltinType.Int:
-            return True
-        case bool(), BuiltinType.Bool:
-            return True
-        case str(), BuiltinType.String:
-            return True
-        case str() as word, LangType(grammar):
-            return word in grammar
-        case value, RefinementType(base, cond):
-            return value_has_type(value, base) and cond.apply(value)
-        case _:
-            return False
+    if isinstance(typ, BuiltinType):
+        return isinstance(value, builtin_classes[typ])
+    if isinstance(typ, LangType):
+        return isinstance(value, str) and value in typ.grammar
+    if isinstance(typ, RefinementType):
+        return value_has_type(value, typ.base) and typ.cond.apply(value)
+    return False
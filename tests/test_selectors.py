@@ -0,0 +1,28 @@
+from flat.lib import xpath, select_all
+from flat.py import lang
+from flat.py.isla_extensions import ebnf_direct_child, ebnf_kth_child
+
+# NOTE: bounded and exact repetitions are encoded with intermediate `<-N>` rules, which selectors must look through
+IP = lang('IP', 'start: octet "." octet; octet: d{1,3}; d: [0-9];')
+X = lang('X', 'start: x; x: y{17}; y: "a";')
+
+
+def test_select_in_range_repetition():
+    assert select_all(xpath(IP, '..octet.d'), '12.345') == ['1', '2', '3', '4', '5']
+    assert select_all(xpath(IP, '..octet.d[3]'), '12.345') == ['5']
+    assert select_all(xpath(IP, '.octet[2].d[2]'), '12.345') == ['4']
+
+
+def test_select_exact_repetition():
+    assert select_all(xpath(X, '.x.y'), 'a' * 17) == ['a'] * 17
+    assert select_all(xpath(X, '.x.y[9]'), 'a' * 17) == ['a']
+
+
+def test_ebnf_predicates_in_range_repetition():
+    tree = IP.grammar.parse('12.345')
+    octet = [path for path, _ in tree.filter(lambda node: node.value == '<octet>')][1]
+    digits = [path for path, _ in tree.filter(lambda node: node.value == '<d>') if path[:len(octet)] == octet]
+    assert len(digits) == 3
+    for k, path in enumerate(digits):
+        assert ebnf_direct_child(tree, path, octet)
+        assert ebnf_kth_child(tree, path, octet, k + 1)